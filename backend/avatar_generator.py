@@ -1,7 +1,13 @@
 import cv2
 import numpy as np
+import os
 import logging
 import time
+import threading
+import functools
+import itertools
+import operator
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import mediapipe as mp
 
@@ -12,33 +18,169 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Column names of the face and pose landmark arrays
+FACE_LANDMARK_KEYS = ('x', 'y', 'z')
+POSE_LANDMARK_KEYS = ('x', 'y', 'z', 'visibility')
+
+PoseLandmark = mp.solutions.pose.PoseLandmark
+
+# The neck is placed this far above the shoulder midpoint (pose array columns)
+NECK_OFFSET = np.array([0.0, 10.0, 0.0, 0.0], dtype=np.float32)
+
+# MediaPipe Tasks model bundles used for GPU inference (see download_models.py)
+FACE_LANDMARKER_MODEL = "face_landmarker.task"
+
+# Pose landmarker bundle for each BlazePose model complexity (lite/full/heavy)
+POSE_LANDMARKER_MODELS = {
+    0: "pose_landmarker_lite.task",
+    1: "pose_landmarker_full.task",
+    2: "pose_landmarker_heavy.task"
+}
+
+# Landmark indices from MediaPipe Face Mesh (468+ refer to the refined iris landmarks)
+FACE_OVAL_IDX = np.array([
+    10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288,
+    397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136,
+    172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109
+], dtype=np.int32)
+
+EYE_FEATURES = ('center', 'left_corner', 'right_corner', 'top', 'bottom', 'iris')
+LEFT_EYE_IDX = np.array([468, 263, 362, 386, 374, 473], dtype=np.int32)
+RIGHT_EYE_IDX = np.array([473, 133, 33, 159, 145, 468], dtype=np.int32)
+
+NOSE_FEATURES = ('tip', 'bottom', 'bridge')
+NOSE_IDX = np.array([4, 94, 6], dtype=np.int32)
+
+MOUTH_FEATURES = ('left_corner', 'right_corner', 'top', 'bottom')
+MOUTH_IDX = np.array([61, 291, 13, 14], dtype=np.int32)
+
 class AvatarGenerator:
     """
     Generate avatars from segmented images using advanced image processing
     """
     
-    def __init__(self):
-        """Initialize the avatar generator with required models and settings"""
+    def __init__(self, model_dir="models", model_complexity=1, enable_segmentation=False):
+        """
+        Initialize the avatar generator with required models and settings
+        
+        Args:
+            model_dir: Directory containing the MediaPipe Tasks model bundles
+            model_complexity: BlazePose model complexity (0 lite, 1 full,
+                2 heavy)
+            enable_segmentation: Also run the pose segmentation head; off by
+                default since SAM already provides the person mask
+        """
+        if model_complexity not in POSE_LANDMARKER_MODELS:
+            raise ValueError(f"Unsupported pose model complexity: {model_complexity}")
+        
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
+        self.model_dir = model_dir
+        self.model_complexity = model_complexity
+        self.enable_segmentation = enable_segmentation
+        
+        # Face and pose detection run concurrently, each on its own worker
+        # thread. MediaPipe graphs are not thread-safe, so a single worker per
+        # model also serializes concurrent generate calls per model
+        self._face_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='face-mesh')
+        self._pose_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pose')
+        
+        # Per-thread scratch buffers and CLAHE instances reused across generate calls
+        self._buffers = threading.local()
+        
+        logger.info("Avatar generator initialized")
+    
+    @functools.cached_property
+    def face_mesh(self):
+        """
+        Face landmark model, created on first use
+        
+        Prefers the GPU-delegated Tasks landmarker and falls back to the CPU
+        solution. Only the face worker thread touches it, so the lazy
+        initialization cannot race.
+        """
+        return self._create_face_landmarker()
+    
+    @functools.cached_property
+    def pose(self):
+        """
+        Pose landmark model, created on first use
+        
+        Prefers the GPU-delegated Tasks landmarker and falls back to the CPU
+        solution. Only the pose worker thread touches it, so the lazy
+        initialization cannot race.
+        """
+        return self._create_pose_landmarker()
+    
+    def _create_face_landmarker(self):
+        """
+        Create the face landmark model
         
-        # Initialize face mesh and pose detection models
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        Returns:
+            FaceLandmarker on the GPU delegate if available, otherwise FaceMesh
+        """
+        model_path = os.path.join(self.model_dir, FACE_LANDMARKER_MODEL)
+        
+        if os.path.exists(model_path):
+            try:
+                vision = mp.tasks.vision
+                options = vision.FaceLandmarkerOptions(
+                    base_options=mp.tasks.BaseOptions(
+                        model_asset_path=model_path,
+                        delegate=mp.tasks.BaseOptions.Delegate.GPU
+                    ),
+                    running_mode=vision.RunningMode.IMAGE,
+                    num_faces=1,
+                    min_face_detection_confidence=0.5
+                )
+                landmarker = vision.FaceLandmarker.create_from_options(options)
+                logger.info("Face landmarker running on GPU delegate")
+                return landmarker
+            except Exception as e:
+                logger.warning(f"GPU face landmarker unavailable, falling back to CPU: {str(e)}")
+        
+        return self.mp_face_mesh.FaceMesh(
             static_image_mode=True,
             max_num_faces=1,
             min_detection_confidence=0.5,
             refine_landmarks=True
         )
+    
+    def _create_pose_landmarker(self):
+        """
+        Create the pose landmark model
+        
+        Returns:
+            PoseLandmarker on the GPU delegate if available, otherwise Pose
+        """
+        model_path = os.path.join(self.model_dir, POSE_LANDMARKER_MODELS[self.model_complexity])
         
-        self.pose = self.mp_pose.Pose(
+        if os.path.exists(model_path):
+            try:
+                vision = mp.tasks.vision
+                options = vision.PoseLandmarkerOptions(
+                    base_options=mp.tasks.BaseOptions(
+                        model_asset_path=model_path,
+                        delegate=mp.tasks.BaseOptions.Delegate.GPU
+                    ),
+                    running_mode=vision.RunningMode.IMAGE,
+                    num_poses=1,
+                    min_pose_detection_confidence=0.5,
+                    output_segmentation_masks=self.enable_segmentation
+                )
+                landmarker = vision.PoseLandmarker.create_from_options(options)
+                logger.info("Pose landmarker running on GPU delegate")
+                return landmarker
+            except Exception as e:
+                logger.warning(f"GPU pose landmarker unavailable, falling back to CPU: {str(e)}")
+        
+        return self.mp_pose.Pose(
             static_image_mode=True,
-            model_complexity=2,
-            enable_segmentation=True,
+            model_complexity=self.model_complexity,
+            enable_segmentation=self.enable_segmentation,
             min_detection_confidence=0.5
         )
-        
-        logger.info("Avatar generator initialized")
     
     def generate(self, segmented_image):
         """
@@ -63,17 +205,21 @@ class AvatarGenerator:
             else:
                 raise ValueError("Unexpected image format, expected RGB or RGBA")
         
-        # Process the image to detect landmarks and create avatar data
-        avatar_image = segmented_image.copy()
-        
-        # Extract RGB image for landmark detection
-        rgb_image = cv2.cvtColor(segmented_image[:, :, :3], cv2.COLOR_BGR2RGB)
-        
-        # Detect facial landmarks
-        face_landmarks = self._detect_face_landmarks(rgb_image)
+        # Extract a contiguous RGB image for landmark detection. Converting
+        # straight from the 4-channel image avoids the strided [:, :, :3] copy,
+        # and the destination buffer is reused while the frame size is unchanged
+        rgb_image = cv2.cvtColor(
+            segmented_image,
+            cv2.COLOR_BGRA2RGB,
+            dst=self._get_buffer('rgb', (*segmented_image.shape[:2], 3))
+        )
         
-        # Detect body landmarks (pose)
-        pose_landmarks = self._detect_pose_landmarks(rgb_image)
+        # Detect facial and body (pose) landmarks in parallel; MediaPipe
+        # releases the GIL while its graph runs
+        face_future = self._face_executor.submit(self._detect_face_landmarks, rgb_image)
+        pose_future = self._pose_executor.submit(self._detect_pose_landmarks, rgb_image)
+        face_landmarks = face_future.result()
+        pose_landmarks = pose_future.result()
         
         # Combine the landmarks
         landmarks = {
@@ -82,7 +228,7 @@ class AvatarGenerator:
         }
         
         # Apply any necessary enhancements or post-processing
-        enhanced_image = self._enhance_image(avatar_image)
+        enhanced_image = self._enhance_image(segmented_image)
         
         logger.info(f"Avatar generation completed in {time.time() - start_time:.2f} seconds")
         
@@ -91,28 +237,89 @@ class AvatarGenerator:
             'landmarks': landmarks
         }
     
+    def _get_buffer(self, name, shape, dtype=np.uint8):
+        """
+        Get a named scratch buffer of the calling thread
+        
+        Scratch buffers only hold intermediates of a single call; arrays
+        returned to the caller are always freshly allocated.
+        
+        Args:
+            name: Buffer name
+            shape: Required buffer shape
+            dtype: Required buffer dtype
+            
+        Returns:
+            Contiguous buffer, reallocated when the shape or dtype changes
+        """
+        buffers = self._buffers.__dict__
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            buffers[name] = buffer
+        
+        return buffer
+    
+    def _get_clahe(self):
+        """
+        Get the CLAHE instance of the calling thread
+        
+        Returns:
+            cv2.CLAHE: Contrast limited histogram equalizer, created once per
+            thread since OpenCV algorithm objects are not thread-safe
+        """
+        clahe = getattr(self._buffers, 'clahe', None)
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            self._buffers.clahe = clahe
+        
+        return clahe
+    
     def apply_mask(self, image, mask):
         """
         Apply a binary mask to an image, creating an RGBA image
         
         Args:
             image: Input RGB image
-            mask: Binary mask
+            mask: Binary mask (bool, or uint8 with nonzero foreground)
             
         Returns:
             RGBA image with background made transparent
         """
-        # Create an RGBA image
-        rgba = np.zeros((image.shape[0], image.shape[1], 4), dtype=np.uint8)
+        # Create the RGBA image in a single allocation; cvtColor copies the
+        # RGB channels and appends the alpha channel in one SIMD pass
+        if image.shape[2] == 4:
+            rgba = image.copy()
+        else:
+            rgba = cv2.cvtColor(image, cv2.COLOR_RGB2RGBA)
         
-        # Copy the RGB channels
-        rgba[:, :, :3] = image[:, :, :3]
-        
-        # Set the alpha channel based on the mask
-        rgba[:, :, 3] = mask.astype(np.uint8) * 255
+        # Set the alpha channel based on the mask, writing straight into the output.
+        # A boolean mask is reinterpreted as 0/1 bytes so the multiply runs as
+        # a plain uint8 loop without a buffered bool->uint8 cast; other masks
+        # are thresholded (nonzero is foreground) into the alpha channel itself,
+        # so no intermediate boolean mask is materialized
+        alpha = rgba[:, :, 3]
+        if mask.dtype == np.bool_:
+            np.multiply(mask.view(np.uint8), np.uint8(255), out=alpha)
+        else:
+            np.not_equal(mask, 0, out=alpha.view(np.bool_))
+            alpha *= np.uint8(255)
         
         return rgba
     
+    @staticmethod
+    def _to_mp_image(image):
+        """
+        Wrap an RGB array as a MediaPipe image for the Tasks landmarkers
+        
+        Args:
+            image: RGB image
+            
+        Returns:
+            mp.Image: Image in SRGB format
+        """
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image))
+    
     def _detect_face_landmarks(self, image):
         """
         Detect facial landmarks in an image
@@ -125,48 +332,35 @@ class AvatarGenerator:
         """
         try:
             # Detect face landmarks using MediaPipe
-            results = self.face_mesh.process(image)
+            if isinstance(self.face_mesh, mp.tasks.vision.FaceLandmarker):
+                results = self.face_mesh.detect(self._to_mp_image(image))
+                faces = results.face_landmarks
+            else:
+                results = self.face_mesh.process(image)
+                faces = [face.landmark for face in results.multi_face_landmarks or ()]
             
-            if not results.multi_face_landmarks:
+            if not faces:
                 logger.warning("No face detected in the image")
                 return None
             
             # Get the first face
-            face = results.multi_face_landmarks[0]
+            face = faces[0]
             
-            # Convert landmarks to a more convenient format
-            landmarks = {}
+            # Convert landmarks to an (N, 3) array in pixel coordinates
             h, w = image.shape[:2]
-            
-            # Extract key facial landmarks
-            for idx, landmark in enumerate(face.landmark):
-                x = landmark.x * w
-                y = landmark.y * h
-                z = landmark.z  # Relative depth
-                
-                landmarks[idx] = {
-                    'x': x,
-                    'y': y,
-                    'z': z
-                }
+            landmarks = self._landmark_array(face, FACE_LANDMARK_KEYS, (w, h, 1.0))  # z stays relative depth
             
             # Extract common facial features for easier reference
             # Using indices from MediaPipe Face Mesh
             features = {
                 'left_eye': self._get_eye_landmarks(landmarks, 'left'),
                 'right_eye': self._get_eye_landmarks(landmarks, 'right'),
-                'nose': {
-                    'tip': landmarks.get(4, None),
-                    'bottom': landmarks.get(94, None),
-                    'bridge': landmarks.get(6, None)
-                },
-                'mouth': {
-                    'left_corner': landmarks.get(61, None),
-                    'right_corner': landmarks.get(291, None),
-                    'top': landmarks.get(13, None),
-                    'bottom': landmarks.get(14, None)
-                },
-                'face_oval': self._get_face_oval_landmarks(landmarks)
+                'nose': self._gather_points(landmarks, NOSE_FEATURES, NOSE_IDX),
+                'mouth': self._gather_points(landmarks, MOUTH_FEATURES, MOUTH_IDX),
+                'face_oval': self._get_face_oval_landmarks(landmarks),
+                # (N, 2) pixel coordinates of the same contour, so consumers
+                # can reduce over it without walking the dicts
+                'face_oval_xy': np.ascontiguousarray(landmarks[FACE_OVAL_IDX, :2])
             }
             
             return {
@@ -178,42 +372,76 @@ class AvatarGenerator:
             logger.error(f"Error detecting face landmarks: {e}")
             return None
     
+    def _landmark_array(self, landmarks, keys, scale):
+        """
+        Convert MediaPipe landmarks to a scaled float32 array
+        
+        The attribute values are streamed straight into the array with
+        np.fromiter, without building an intermediate list of tuples.
+        
+        Args:
+            landmarks: Sequence of MediaPipe landmarks
+            keys: Landmark attributes to extract, one column each
+            scale: Per-column scale factors (e.g. image width and height)
+            
+        Returns:
+            (N, len(keys)) float32 landmark array
+        """
+        count = len(landmarks)
+        values = itertools.chain.from_iterable(map(operator.attrgetter(*keys), landmarks))
+        array = np.fromiter(values, dtype=np.float32, count=count * len(keys))
+        array = array.reshape(count, len(keys))
+        array *= np.array(scale, dtype=np.float32)
+        
+        return array
+    
+    def _landmark_point(self, landmarks, idx, keys=FACE_LANDMARK_KEYS):
+        """
+        Build a landmark dict from a row of a landmark array
+        
+        Args:
+            landmarks: (N, len(keys)) landmark array
+            idx: Landmark index
+            keys: Column names of the landmark array
+            
+        Returns:
+            dict: Landmark coordinates or None if the index is not available
+        """
+        if idx >= len(landmarks):
+            return None
+        
+        return dict(zip(keys, landmarks[idx].tolist()))
+    
+    def _gather_points(self, landmarks, names, indices, keys=FACE_LANDMARK_KEYS):
+        """
+        Gather several landmarks at once into a dict of named points
+        
+        Args:
+            landmarks: (N, len(keys)) landmark array
+            names: Feature names, one per index
+            indices: Landmark index array
+            keys: Column names of the landmark array
+            
+        Returns:
+            dict: Feature name to landmark dict, None for unavailable indices
+        """
+        available = indices < len(landmarks)
+        rows = iter(landmarks[indices[available]].tolist())
+        
+        return {
+            name: dict(zip(keys, next(rows))) if ok else None
+            for name, ok in zip(names, available)
+        }
+    
     def _get_eye_landmarks(self, landmarks, side):
         """Extract eye landmarks"""
-        if side == 'left':
-            return {
-                'center': landmarks.get(468, None),
-                'left_corner': landmarks.get(263, None),
-                'right_corner': landmarks.get(362, None),
-                'top': landmarks.get(386, None),
-                'bottom': landmarks.get(374, None),
-                'iris': landmarks.get(473, None)
-            }
-        else:  # right
-            return {
-                'center': landmarks.get(473, None),
-                'left_corner': landmarks.get(133, None),
-                'right_corner': landmarks.get(33, None),
-                'top': landmarks.get(159, None),
-                'bottom': landmarks.get(145, None),
-                'iris': landmarks.get(468, None)
-            }
+        indices = LEFT_EYE_IDX if side == 'left' else RIGHT_EYE_IDX
+        return self._gather_points(landmarks, EYE_FEATURES, indices)
     
     def _get_face_oval_landmarks(self, landmarks):
         """Extract face contour landmarks"""
-        # Indices for the face oval in MediaPipe Face Mesh
-        oval_indices = [
-            10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288,
-            397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136,
-            172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109
-        ]
-        
-        oval = {}
-        for i, idx in enumerate(oval_indices):
-            if idx in landmarks:
-                oval[i] = landmarks[idx]
-        
-        return oval
+        rows = landmarks[FACE_OVAL_IDX].tolist()
+        return {i: dict(zip(FACE_LANDMARK_KEYS, row)) for i, row in enumerate(rows)}
     
     def _detect_pose_landmarks(self, image):
         """
@@ -227,43 +455,34 @@ class AvatarGenerator:
         """
         try:
             # Detect pose landmarks using MediaPipe
-            results = self.pose.process(image)
+            if isinstance(self.pose, mp.tasks.vision.PoseLandmarker):
+                results = self.pose.detect(self._to_mp_image(image))
+                pose = results.pose_landmarks[0] if results.pose_landmarks else None
+            else:
+                results = self.pose.process(image)
+                pose = results.pose_landmarks.landmark if results.pose_landmarks else None
             
-            if not results.pose_landmarks:
+            if not pose:
                 logger.warning("No pose detected in the image")
                 return None
             
-            # Convert landmarks to a more convenient format
-            landmarks = {}
+            # Convert landmarks to an (N, 4) array of pixel coordinates and visibility
             h, w = image.shape[:2]
-            
-            # Extract key pose landmarks
-            for idx, landmark in enumerate(results.pose_landmarks.landmark):
-                x = landmark.x * w
-                y = landmark.y * h
-                z = landmark.z
-                visibility = landmark.visibility
-                
-                landmarks[idx] = {
-                    'x': x,
-                    'y': y,
-                    'z': z,
-                    'visibility': visibility
-                }
+            landmarks = self._landmark_array(pose, POSE_LANDMARK_KEYS, (w, h, 1.0, 1.0))
             
             # Extract common body parts for easier reference
             features = {
                 'shoulders': {
-                    'left': landmarks.get(mp.solutions.pose.PoseLandmark.LEFT_SHOULDER.value, None),
-                    'right': landmarks.get(mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value, None)
+                    'left': self._landmark_point(landmarks, PoseLandmark.LEFT_SHOULDER.value, POSE_LANDMARK_KEYS),
+                    'right': self._landmark_point(landmarks, PoseLandmark.RIGHT_SHOULDER.value, POSE_LANDMARK_KEYS)
                 },
                 'wrists': {
-                    'left': landmarks.get(mp.solutions.pose.PoseLandmark.LEFT_WRIST.value, None),
-                    'right': landmarks.get(mp.solutions.pose.PoseLandmark.RIGHT_WRIST.value, None)
+                    'left': self._landmark_point(landmarks, PoseLandmark.LEFT_WRIST.value, POSE_LANDMARK_KEYS),
+                    'right': self._landmark_point(landmarks, PoseLandmark.RIGHT_WRIST.value, POSE_LANDMARK_KEYS)
                 },
                 'hips': {
-                    'left': landmarks.get(mp.solutions.pose.PoseLandmark.LEFT_HIP.value, None),
-                    'right': landmarks.get(mp.solutions.pose.PoseLandmark.RIGHT_HIP.value, None)
+                    'left': self._landmark_point(landmarks, PoseLandmark.LEFT_HIP.value, POSE_LANDMARK_KEYS),
+                    'right': self._landmark_point(landmarks, PoseLandmark.RIGHT_HIP.value, POSE_LANDMARK_KEYS)
                 },
                 'neck': self._calculate_neck_position(landmarks)
             }
@@ -279,22 +498,15 @@ class AvatarGenerator:
     
     def _calculate_neck_position(self, landmarks):
         """Calculate approximate neck position from pose landmarks"""
-        # Neck is typically between the shoulders and slightly up
-        left_shoulder = landmarks.get(mp.solutions.pose.PoseLandmark.LEFT_SHOULDER.value)
-        right_shoulder = landmarks.get(mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value)
+        left = PoseLandmark.LEFT_SHOULDER.value
+        right = PoseLandmark.RIGHT_SHOULDER.value
+        if max(left, right) >= len(landmarks):
+            return None
         
-        if left_shoulder and right_shoulder:
-            neck_x = (left_shoulder['x'] + right_shoulder['x']) / 2
-            neck_y = (left_shoulder['y'] + right_shoulder['y']) / 2 - 10  # Slightly above shoulders
-            neck_z = (left_shoulder['z'] + right_shoulder['z']) / 2
-            
-            return {
-                'x': neck_x,
-                'y': neck_y,
-                'z': neck_z
-            }
+        # Neck is typically between the shoulders and slightly up
+        neck = (landmarks[left] + landmarks[right]) * 0.5 - NECK_OFFSET
         
-        return None
+        return dict(zip(FACE_LANDMARK_KEYS, neck[:3].tolist()))
     
     def _enhance_image(self, image):
         """
@@ -306,26 +518,30 @@ class AvatarGenerator:
         Returns:
             Enhanced RGBA image
         """
-        # Create a copy to avoid modifying the original
-        enhanced = image.copy()
+        h, w = image.shape[:2]
         
-        # Separate the alpha channel
-        rgb = enhanced[:, :, :3]
-        alpha = enhanced[:, :, 3]
+        # The alpha channel is a read-only view, the input is never modified
+        # so no defensive copy is needed
+        alpha = image[:, :, 3:4]
         
-        # Apply slight contrast enhancement
-        lab = cv2.cvtColor(rgb, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
+        # Apply slight contrast enhancement. The colour channels are extracted
+        # and converted into per-thread scratch buffers, so steady-state calls
+        # at a fixed frame size allocate nothing but the output
+        bgr = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR, dst=self._get_buffer('bgr', (h, w, 3)))
+        lab = cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB, dst=self._get_buffer('lab', (h, w, 3)))
         
-        # Apply CLAHE to L channel
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        cl = clahe.apply(l)
+        # Apply CLAHE to the L channel in place; CLAHE needs a contiguous
+        # single-channel input, so only L is copied out instead of splitting
+        # and merging all three channels
+        l_channel = self._get_buffer('l_channel', (h, w))
+        np.copyto(l_channel, lab[:, :, 0])
+        lab[:, :, 0] = self._get_clahe().apply(l_channel, dst=l_channel)
         
-        # Merge channels back
-        updated_lab = cv2.merge((cl, a, b))
-        enhanced_rgb = cv2.cvtColor(updated_lab, cv2.COLOR_LAB2BGR)
+        # The BGR buffer is free again and receives the enhanced colours
+        enhanced_rgb = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=bgr)
         
-        # Combine with original alpha channel
-        enhanced = np.dstack((enhanced_rgb, alpha))
+        # Combine with original alpha channel directly into the output array
+        enhanced = np.empty(image.shape, dtype=np.uint8)
+        np.concatenate((enhanced_rgb, alpha), axis=2, out=enhanced)
         
         return enhanced
\ No newline at end of file
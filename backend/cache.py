@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+def _nbytes(value):
+    """
+    Estimate the memory held by a cached value
+    
+    Only NumPy arrays and byte strings are counted, since images dominate the
+    size of cached data; dicts, lists and tuples are searched recursively.
+    
+    Args:
+        value: Cached value
+    
+    Returns:
+        int: Total size of the arrays in bytes
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and bytes
+    """
+    
+    def __init__(self, maxsize=128, max_bytes=None, evictable=None):
+        """
+        Initialize the cache
+        
+        Args:
+            maxsize: Maximum number of entries
+            max_bytes: Optional maximum total size of the cached arrays and bytes
+            evictable: Optional predicate on a value; entries for which it
+                returns False are never evicted, so the cache can exceed its
+                limits while they are held
+        """
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.evictable = evictable
+        self.total_bytes = 0
+        
+        # Maps key -> (value, size in bytes), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """
+        Get a value and mark it as most recently used
+        
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing
+        
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def __getitem__(self, key):
+        with self._lock:
+            value, _ = self._entries[key]
+            self._entries.move_to_end(key)
+            return value
+    
+    def __setitem__(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            
+            # Evict least recently used entries, always keeping the newest one
+            # and any entry that is not evictable
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.maxsize
+                or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+            ):
+                victim = next((
+                    old_key for old_key, (old_value, _) in self._entries.items()
+                    if old_key != key and (self.evictable is None or self.evictable(old_value))
+                ), None)
+                if victim is None:
+                    break
+                self.total_bytes -= self._entries.pop(victim)[1]
+    
+    def __delitem__(self, key):
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key)[1]
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
\ No newline at end of file
@@ -5,10 +5,15 @@ Download required models for the Virtual Fitting Avatar application
 
 import os
 import requests
+import hashlib
 import logging
 from tqdm import tqdm
 import argparse
 import sys
+import shutil
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -17,33 +22,188 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Model URLs and file paths
+# Model URLs and file paths. The SAM checkpoint names end with the first
+# hex digits of their MD5 digest, which is checked after download
 MODELS = {
     'vit_h': {
         'url': 'https://dl.fbaipublicfiles.com/segment_anything/sam_vit_h_4b8939.pth',
         'path': 'models/sam_vit_h_4b8939.pth',
+        'md5_prefix': '4b8939',
         'description': 'SAM ViT-H model (2.6GB)'
     },
     'vit_l': {
         'url': 'https://dl.fbaipublicfiles.com/segment_anything/sam_vit_l_0b3195.pth', 
         'path': 'models/sam_vit_l_0b3195.pth',
+        'md5_prefix': '0b3195',
         'description': 'SAM ViT-L model (1.2GB)'
     },
     'vit_b': {
         'url': 'https://dl.fbaipublicfiles.com/segment_anything/sam_vit_b_01ec64.pth',
         'path': 'models/sam_vit_b_01ec64.pth',
+        'md5_prefix': '01ec64',
         'description': 'SAM ViT-B model (375MB)'
+    },
+    'vit_t': {
+        'url': 'https://github.com/ChaoningZhang/MobileSAM/raw/master/weights/mobile_sam.pt',
+        'path': 'models/mobile_sam.pt',
+        'description': 'MobileSAM ViT-T model (40MB, requires the mobile_sam package)'
+    },
+    'face_landmarker': {
+        'url': 'https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task',
+        'path': 'models/face_landmarker.task',
+        'description': 'MediaPipe Face Landmarker for GPU inference (4MB)'
+    },
+    'pose_landmarker_lite': {
+        'url': 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task',
+        'path': 'models/pose_landmarker_lite.task',
+        'description': 'MediaPipe Pose Landmarker (lite) for GPU inference (6MB)'
+    },
+    'pose_landmarker': {
+        'url': 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_full/float16/1/pose_landmarker_full.task',
+        'path': 'models/pose_landmarker_full.task',
+        'description': 'MediaPipe Pose Landmarker (full) for GPU inference (9MB)'
+    },
+    'pose_landmarker_heavy': {
+        'url': 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_heavy/float16/1/pose_landmarker_heavy.task',
+        'path': 'models/pose_landmarker_heavy.task',
+        'description': 'MediaPipe Pose Landmarker (heavy) for GPU inference (30MB)'
     }
 }
 
-def download_file(url, destination, description=None):
+# Number of parallel range requests per download
+DOWNLOAD_WORKERS = 8
+
+# Copy buffer for streaming response bodies to disk, and how often (seconds)
+# the progress bar is refreshed from the bytes read so far
+COPY_BUFFER_SIZE = 4 * 1024 * 1024  # 4 MB
+PROGRESS_INTERVAL = 0.25
+
+@contextlib.contextmanager
+def _track_progress(progress_bar, responses):
+    """
+    Update a progress bar from a watcher thread while responses are copied
+    
+    The copy loops run in shutil.copyfileobj without per-chunk Python
+    callbacks; the watcher polls the number of bytes read from each response
+    instead.
+    
+    Args:
+        progress_bar: tqdm progress bar to update
+        responses: List of streaming responses being downloaded (may grow)
+    """
+    stop = threading.Event()
+    
+    def refresh():
+        downloaded = sum(response.raw.tell() for response in list(responses))
+        progress_bar.update(downloaded - progress_bar.n)
+    
+    def watch():
+        while not stop.wait(PROGRESS_INTERVAL):
+            refresh()
+    
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        watcher.join()
+        refresh()
+
+def _download_stream(url, destination, progress_bar):
+    """
+    Download a file over a single connection
+    
+    Args:
+        url: URL to download from
+        destination: Path to save file to
+        progress_bar: tqdm progress bar to update
+    """
+    response = requests.get(url, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    
+    # Download the file with progress tracking
+    with _track_progress(progress_bar, [response]), open(destination, 'wb') as f:
+        shutil.copyfileobj(response.raw, f, COPY_BUFFER_SIZE)
+
+def _download_ranges(url, destination, total_size, workers, progress_bar):
+    """
+    Download a file as parallel HTTP range requests
+    
+    Each worker fetches one contiguous byte range and writes it at its offset
+    in the pre-sized destination file, so no merge step is needed.
+    
+    Args:
+        url: URL to download from (must support range requests)
+        destination: Path to save file to
+        total_size: Size of the file in bytes
+        workers: Number of parallel range requests
+        progress_bar: tqdm progress bar to update
+    """
+    part_size = -(-total_size // workers)  # Ceiling division
+    ranges = [
+        (start, min(start + part_size, total_size) - 1)
+        for start in range(0, total_size, part_size)
+    ]
+    responses = []
+    
+    # Pre-size the file so every worker can write at its own offset
+    with open(destination, 'wb') as f:
+        f.truncate(total_size)
+    
+    def download_range(byte_range):
+        start, end = byte_range
+        response = requests.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Server ignored range request for bytes {start}-{end}")
+        response.raw.decode_content = True
+        responses.append(response)
+        
+        with open(destination, 'r+b') as f:
+            f.seek(start)
+            shutil.copyfileobj(response.raw, f, COPY_BUFFER_SIZE)
+    
+    with _track_progress(progress_bar, responses), ThreadPoolExecutor(max_workers=workers) as executor:
+        # Consuming the results re-raises the first worker error
+        list(executor.map(download_range, ranges))
+
+def _verify_checksum(path, md5_prefix):
+    """
+    Check the MD5 digest of a downloaded file against its expected prefix
+    
+    The file is hashed after the download completes, since range downloads
+    write it out of order. hashlib releases the GIL and uses the OpenSSL
+    implementation, so this runs at close to disk speed.
+    
+    Args:
+        path: Path of the downloaded file
+        md5_prefix: Expected leading hex digits of the MD5 digest
+        
+    Returns:
+        bool: True if the digest matches
+    """
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    
+    return digest.hexdigest().startswith(md5_prefix)
+
+def download_file(url, destination, description=None, workers=DOWNLOAD_WORKERS, md5_prefix=None):
     """
     Download a file with progress tracking
     
+    Uses parallel range requests when the server supports them, which keeps
+    the link saturated when per-connection throughput is capped.
+    
     Args:
         url: URL to download from
         destination: Path to save file to
         description: Description of the file for display
+        workers: Number of parallel range requests (1 disables them)
+        md5_prefix: Optional expected leading hex digits of the file's MD5
         
     Returns:
         bool: True if download was successful, False otherwise
@@ -60,12 +220,13 @@ def download_file(url, destination, description=None):
         # Download the file
         logger.info(f"Downloading {description or url} to {destination}")
         
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        # Probe the file size and range support, following redirects once
+        head = requests.head(url, allow_redirects=True)
+        head.raise_for_status()
         
         # Get file size for progress tracking
-        total_size = int(response.headers.get('content-length', 0))
-        block_size = 1024  # 1 KB
+        total_size = int(head.headers.get('content-length', 0))
+        accepts_ranges = head.headers.get('accept-ranges', '').lower() == 'bytes'
         
         # Create progress bar
         progress_bar = tqdm(
@@ -75,18 +236,23 @@ def download_file(url, destination, description=None):
             desc=os.path.basename(destination)
         )
         
-        # Download the file with progress tracking
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=block_size):
-                if chunk:
-                    progress_bar.update(len(chunk))
-                    f.write(chunk)
+        if workers > 1 and accepts_ranges and total_size > 0:
+            _download_ranges(head.url, destination, total_size, workers, progress_bar)
+        else:
+            _download_stream(url, destination, progress_bar)
         
         progress_bar.close()
         
         # Verify file size
         if total_size != 0 and progress_bar.n != total_size:
             logger.error("Downloaded file size doesn't match expected size")
+            os.remove(destination)
+            return False
+        
+        # Verify file contents
+        if md5_prefix and not _verify_checksum(destination, md5_prefix):
+            logger.error(f"Checksum mismatch for {destination}")
+            os.remove(destination)
             return False
         
         logger.info(f"Download complete: {destination}")
@@ -104,8 +270,10 @@ def download_file(url, destination, description=None):
 
 def main():
     parser = argparse.ArgumentParser(description='Download models for Virtual Fitting Avatar')
-    parser.add_argument('--model', choices=['vit_h', 'vit_l', 'vit_b', 'all'], default='vit_h',
-                        help='Model type to download (default: vit_h)')
+    parser.add_argument('--model', choices=[*MODELS, 'all'], default='vit_b',
+                        help='Model type to download (default: vit_b)')
+    parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS,
+                        help=f'Parallel range requests per file (default: {DOWNLOAD_WORKERS})')
     args = parser.parse_args()
     
     models_to_download = []
@@ -128,7 +296,9 @@ def main():
         result = download_file(
             model_info['url'], 
             model_info['path'],
-            model_info['description']
+            model_info['description'],
+            args.workers,
+            model_info.get('md5_prefix')
         )
         
         if not result:
@@ -3,11 +3,22 @@ import cv2
 import torch
 import logging
 import os
+import contextlib
+import hashlib
+import threading
 import requests
 from PIL import Image
 from io import BytesIO
 from segment_anything import sam_model_registry, SamPredictor
 
+# MobileSAM ("vit_t") is optional and installed separately
+try:
+    from mobile_sam import sam_model_registry as mobile_sam_model_registry
+    from mobile_sam import SamPredictor as MobileSamPredictor
+except ImportError:
+    mobile_sam_model_registry = None
+    MobileSamPredictor = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,17 +26,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Longest side of the SAM image encoder input; larger images are downscaled
+# to this size before encoding and the masks are upscaled afterwards
+SAM_INPUT_SIZE = 1024
+
+# Checkpoint file name and download URL for each supported model type.
+# "vit_t" is MobileSAM, whose 5M-parameter TinyViT encoder is much cheaper
+# than the ViT-H encoder and gives comparable masks for person segmentation
+MODEL_CHECKPOINTS = {
+    "vit_h": ("sam_vit_h_4b8939.pth", "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_h_4b8939.pth"),
+    "vit_l": ("sam_vit_l_0b3195.pth", "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_l_0b3195.pth"),
+    "vit_b": ("sam_vit_b_01ec64.pth", "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_b_01ec64.pth"),
+    "vit_t": ("mobile_sam.pt", "https://github.com/ChaoningZhang/MobileSAM/raw/master/weights/mobile_sam.pt")
+}
+
 class SAMProcessor:
     """
     Processor for segmentation using the Segment Anything Model (SAM)
     """
     
-    def __init__(self, model_type="vit_h", checkpoint_dir="models"):
+    def __init__(self, model_type="vit_b", checkpoint_dir="models"):
         """
         Initialize SAM processor
         
         Args:
-            model_type: Type of SAM model to use ("vit_h", "vit_l", "vit_b")
+            model_type: Type of SAM model to use ("vit_h", "vit_l", "vit_b",
+                or "vit_t" for MobileSAM)
             checkpoint_dir: Directory to store model checkpoints
         """
         self.model_type = model_type
@@ -33,6 +59,12 @@ class SAMProcessor:
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.predictor = None
         
+        # The predictor holds the embedding of the last image it was given;
+        # the lock keeps set_image/predict pairs from interleaving across threads
+        self._lock = threading.Lock()
+        self._image_key = None
+        self._image_scale = 1.0
+        
         logger.info(f"Initializing SAM with model {model_type} on {self.device}")
         
         # Create checkpoint directory if it doesn't exist
@@ -43,41 +75,156 @@ class SAMProcessor:
     
     def _initialize_model(self):
         """Load and initialize the SAM model"""
-        model_filename = {
-            "vit_h": "sam_vit_h_4b8939.pth",
-            "vit_l": "sam_vit_l_0b3195.pth",
-            "vit_b": "sam_vit_b_01ec64.pth"
-        }[self.model_type]
+        if self.model_type not in MODEL_CHECKPOINTS:
+            raise ValueError(f"Unknown SAM model type: {self.model_type}")
+        
+        if self.model_type == "vit_t":
+            if mobile_sam_model_registry is None:
+                raise ImportError("MobileSAM (model_type='vit_t') requires the mobile_sam package")
+            model_registry, predictor_class = mobile_sam_model_registry, MobileSamPredictor
+        else:
+            model_registry, predictor_class = sam_model_registry, SamPredictor
         
+        model_filename, model_url = MODEL_CHECKPOINTS[self.model_type]
         checkpoint_path = os.path.join(self.checkpoint_dir, model_filename)
         
         # Download the model if it doesn't exist
         if not os.path.exists(checkpoint_path):
-            self._download_model(model_filename, checkpoint_path)
+            self._download_model(model_url, checkpoint_path)
         
         try:
             # Initialize the model
-            sam = sam_model_registry[self.model_type](checkpoint=checkpoint_path)
+            sam = model_registry[self.model_type](checkpoint=checkpoint_path)
             sam.to(device=self.device)
             
             # Create predictor
-            self.predictor = SamPredictor(sam)
+            self.predictor = predictor_class(sam)
             logger.info("SAM model loaded successfully")
+            if self.device.type == "cuda":
+                logger.info("SAM inference will run with float16 autocast")
+                self._compile_image_encoder()
         except Exception as e:
             logger.error(f"Error loading SAM model: {e}")
             raise
     
-    def _download_model(self, model_filename, checkpoint_path):
+    def _compile_image_encoder(self):
+        """
+        Compile the SAM image encoder with torch.compile
+        
+        The encoder dominates SAM runtime; compiling it fuses the LayerNorm,
+        GELU and attention ops into larger kernels, and "reduce-overhead" mode
+        replays them as CUDA graphs. The encoder input is always padded to
+        SAM_INPUT_SIZE, so a single warm-up forward at that shape pays the
+        compile cost at startup instead of on the first request. Falls back to
+        the eager encoder if compilation is unavailable or fails.
+        """
+        if not hasattr(torch, "compile"):
+            return
+        
+        model = self.predictor.model
+        image_encoder = model.image_encoder
+        try:
+            model.image_encoder = torch.compile(image_encoder, mode="reduce-overhead", fullgraph=False)
+            
+            logger.info("Compiling SAM image encoder (warm-up)")
+            dummy_input = torch.zeros((1, 3, SAM_INPUT_SIZE, SAM_INPUT_SIZE), device=self.device)
+            with self._inference_context():
+                model.image_encoder(dummy_input)
+            logger.info("SAM image encoder compiled")
+        except Exception as e:
+            logger.warning(f"torch.compile failed, using the eager SAM image encoder: {e}")
+            model.image_encoder = image_encoder
+    
+    def _inference_context(self):
+        """
+        Context for running SAM inference
+        
+        Disables autograd tracking and, on CUDA, runs the model under float16
+        autocast. The weights stay in float32, so numerically sensitive ops
+        (softmax, layer norm) are still executed in full precision by autocast.
+        
+        Returns:
+            Context manager wrapping the inference calls
+        """
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.device.type == "cuda":
+            stack.enter_context(torch.autocast(device_type="cuda", dtype=torch.float16))
+        return stack
+    
+    def _set_image(self, image):
+        """
+        Set the image in the predictor, reusing the embedding when possible
+        
+        Encoding the image is the most expensive step of SAM, so it is skipped
+        when the predictor already holds the embedding of an identical image
+        (e.g. several point/box prompts on the same photo). Images are keyed by
+        content rather than id(), since ids are recycled between requests.
+        Images larger than SAM_INPUT_SIZE are downscaled with INTER_AREA first:
+        the encoder never sees more than that resolution, so this only saves
+        the full-resolution preprocessing and mask upsampling work.
+        Must be called with self._lock held.
+        
+        Args:
+            image: RGB image (numpy array)
+            
+        Returns:
+            float: Scale factor from original to encoded image coordinates
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(image), digest_size=16).digest()
+        image_key = (image.shape, image.dtype.str, digest)
+        
+        if image_key == self._image_key:
+            logger.debug("Reusing cached SAM image embedding")
+            return self._image_scale
+        
+        h, w = image.shape[:2]
+        scale = min(1.0, SAM_INPUT_SIZE / max(h, w))
+        if scale < 1.0:
+            image = cv2.resize(
+                image,
+                (round(w * scale), round(h * scale)),
+                interpolation=cv2.INTER_AREA
+            )
+        
+        # Invalidate first so a failed encode never leaves a stale key behind
+        self._image_key = None
+        self.predictor.set_image(image)
+        self._image_key = image_key
+        self._image_scale = scale
+        
+        return scale
+    
+    def _postprocess_mask(self, mask_logits, size):
+        """
+        Resize mask logits to the original image size and threshold them
+        
+        Args:
+            mask_logits: Mask logits at the encoded image resolution
+            size: (height, width) of the original image
+            
+        Returns:
+            Binary segmentation mask at the original resolution
+        """
+        h, w = size
+        if mask_logits.shape != (h, w):
+            # Interpolating logits rather than the binary mask keeps smooth edges
+            mask_logits = cv2.resize(
+                mask_logits.astype(np.float32),
+                (w, h),
+                interpolation=cv2.INTER_LINEAR
+            )
+        
+        return mask_logits > self.predictor.model.mask_threshold
+    
+    def _download_model(self, model_url, checkpoint_path):
         """
         Download the SAM model checkpoint
         
         Args:
-            model_filename: Name of the model file
+            model_url: URL of the model checkpoint
             checkpoint_path: Path to save the checkpoint
         """
-        base_url = "https://dl.fbaipublicfiles.com/segment_anything/"
-        model_url = base_url + model_filename
-        
         try:
             logger.info(f"Downloading SAM model from {model_url}")
             response = requests.get(model_url, stream=True)
@@ -128,9 +275,6 @@ class SAMProcessor:
             # Remove alpha channel
             image = image[:, :, :3]
         
-        # Set the image in the predictor
-        self.predictor.set_image(image)
-        
         # Convert normalized coordinates to pixel coordinates if needed
         h, w = image.shape[:2]
         if 0 <= point[0] <= 1 and 0 <= point[1] <= 1:
@@ -143,22 +287,101 @@ class SAMProcessor:
         input_point = np.array([[x, y]])
         input_label = np.array([point_label])
         
-        # Generate masks
-        masks, scores, logits = self.predictor.predict(
-            point_coords=input_point,
-            point_labels=input_label,
-            multimask_output=True
-        )
+        with self._lock, self._inference_context():
+            # Set the image in the predictor (cached across prompts)
+            scale = self._set_image(image)
+            
+            # Generate mask logits at the encoded resolution
+            masks, scores, logits = self.predictor.predict(
+                point_coords=input_point * scale,
+                point_labels=input_label,
+                multimask_output=True,
+                return_logits=True
+            )
         
         # Get the best mask (highest score)
         best_mask_idx = np.argmax(scores)
-        mask = masks[best_mask_idx]
+        mask = self._postprocess_mask(masks[best_mask_idx], (h, w))
         
         # Create masked image
         masked_image = self._apply_mask_to_image(image, mask)
         
         return mask, masked_image
     
+    def segment_from_points(self, image, points, point_labels=None):
+        """
+        Generate one segmentation per point prompt in a single decoder pass
+        
+        All prompts share the image embedding and are decoded as one batch
+        through predict_torch, instead of running the mask decoder once per
+        point (e.g. for a sequence of clicks).
+        
+        Args:
+            image: Input image (numpy array)
+            points: (B, 2) array of [x, y] coordinates (normalized 0-1 or
+                pixel coordinates, decided per point)
+            point_labels: Optional (B,) labels, 1 for foreground (default)
+                and 0 for background
+            
+        Returns:
+            masks: (B, H, W) binary segmentation masks
+            masked_images: (B, H, W, 4) input image with background removed,
+                one per mask
+        """
+        if self.predictor is None:
+            raise ValueError("Model not initialized")
+        
+        # Convert image to RGB if needed
+        if len(image.shape) == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        elif image.shape[2] == 4:
+            # Remove alpha channel
+            image = image[:, :, :3]
+        
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        if point_labels is None:
+            point_labels = np.ones(len(points), dtype=np.int64)
+        point_labels = np.asarray(point_labels, dtype=np.int64).reshape(-1)
+        if len(point_labels) != len(points):
+            raise ValueError("Expected one label per point")
+        
+        # Convert normalized coordinates to pixel coordinates if needed
+        h, w = image.shape[:2]
+        normalized = np.all((points >= 0) & (points <= 1), axis=1)
+        points[normalized] = np.floor(points[normalized] * (w, h))
+        
+        with self._lock, self._inference_context():
+            # Set the image in the predictor (cached across prompts)
+            scale = self._set_image(image)
+            
+            # Map the prompts to the encoder input frame and batch them as
+            # B prompts of one point each
+            input_points = self.predictor.transform.apply_coords(
+                points * scale, self.predictor.original_size
+            )
+            point_coords = torch.as_tensor(input_points, dtype=torch.float, device=self.device)
+            labels = torch.as_tensor(point_labels, dtype=torch.int, device=self.device)
+            
+            # Generate (B, 3, H, W) mask logits at the encoded resolution
+            masks, scores, logits = self.predictor.predict_torch(
+                point_coords=point_coords[:, None, :],
+                point_labels=labels[:, None],
+                multimask_output=True,
+                return_logits=True
+            )
+            
+            # Keep the best mask (highest score) of each prompt
+            best_mask_idx = scores.argmax(dim=1)
+            best_masks = masks[torch.arange(len(points), device=self.device), best_mask_idx]
+            best_masks = best_masks.float().cpu().numpy()
+        
+        masks = np.stack([self._postprocess_mask(m, (h, w)) for m in best_masks])
+        
+        # Create masked images
+        masked_images = np.stack([self._apply_mask_to_image(image, m) for m in masks])
+        
+        return masks, masked_images
+    
     def segment_from_box(self, image, box):
         """
         Generate segmentation from a bounding box prompt
@@ -181,9 +404,6 @@ class SAMProcessor:
             # Remove alpha channel
             image = image[:, :, :3]
         
-        # Set the image in the predictor
-        self.predictor.set_image(image)
-        
         # Convert normalized coordinates to pixel coordinates if needed
         h, w = image.shape[:2]
         if all(0 <= coord <= 1 for coord in box):
@@ -199,15 +419,20 @@ class SAMProcessor:
         # Create input box
         input_box = np.array([x1, y1, x2, y2])
         
-        # Generate masks
-        masks, scores, logits = self.predictor.predict(
-            box=input_box,
-            multimask_output=True
-        )
+        with self._lock, self._inference_context():
+            # Set the image in the predictor (cached across prompts)
+            scale = self._set_image(image)
+            
+            # Generate mask logits at the encoded resolution
+            masks, scores, logits = self.predictor.predict(
+                box=input_box * scale,
+                multimask_output=True,
+                return_logits=True
+            )
         
         # Get the best mask (highest score)
         best_mask_idx = np.argmax(scores)
-        mask = masks[best_mask_idx]
+        mask = self._postprocess_mask(masks[best_mask_idx], (h, w))
         
         # Create masked image
         masked_image = self._apply_mask_to_image(image, mask)
@@ -257,28 +482,20 @@ class SAMProcessor:
         Returns:
             masked_image: Image with background removed
         """
-        # Create a copy of the input image
         if background_color is None:
             # Create an RGBA image with transparent background
-            masked_image = np.zeros((image.shape[0], image.shape[1], 4), dtype=np.uint8)
+            masked_image = np.empty((image.shape[0], image.shape[1], 4), dtype=np.uint8)
             # Copy RGB channels
             masked_image[:, :, :3] = image
-            # Set alpha channel based on mask
-            masked_image[:, :, 3] = mask.astype(np.uint8) * 255
+            # Set alpha channel based on mask, written directly into the output;
+            # the boolean mask is viewed as 0/1 bytes to skip the bool->uint8 cast
+            np.multiply(mask.view(np.uint8), np.uint8(255), out=masked_image[:, :, 3])
         else:
             # Create an RGB image with specified background color
-            masked_image = np.zeros_like(image)
-            # Set background to specified color
-            if not isinstance(background_color, (list, tuple, np.ndarray)):
-                background_color = [background_color] * 3
-            
-            # Create background
-            for c in range(3):
-                masked_image[:, :, c] = background_color[c]
+            background_color = np.asarray(background_color, dtype=np.uint8)
             
-            # Apply foreground
-            for c in range(3):
-                masked_image[:, :, c] = mask * image[:, :, c] + ~mask * masked_image[:, :, c]
+            # Composite foreground over the background in a single pass
+            masked_image = np.where(mask[:, :, None], image, background_color)
         
         return masked_image
     
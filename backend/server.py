@@ -1,22 +1,35 @@
 import os
-import time
-import base64
+import binascii
 import logging
 import tempfile
 from io import BytesIO
 from PIL import Image
 import numpy as np
 import cv2
-import json
+import orjson
+import functools
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException, ServiceUnavailable
 from werkzeug.utils import secure_filename
 
+# PyTurboJPEG is optional; without it (or without libturbojpeg) JPEG uploads
+# are decoded by OpenCV like every other format
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJPF_GRAY
+except ImportError:
+    TurboJPEG = None
+
 # Local imports
 from sam_processor import SAMProcessor
 from avatar_generator import AvatarGenerator
-from virtual_fitting import VirtualFitter
+from virtual_fitting import VirtualFitter, load_accessory_image
+from cache import LRUCache
 
 # Configure logging
 logging.basicConfig(
@@ -25,8 +38,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+try:
+    turbo_jpeg = TurboJPEG() if TurboJPEG else None
+except (OSError, RuntimeError) as e:
+    logger.warning("libturbojpeg not available, decoding JPEG with OpenCV: %s", e)
+    turbo_jpeg = None
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    
+    orjson serializes much faster than the stdlib json module and handles
+    NumPy arrays (the landmark arrays) and integer dict keys natively.
+    """
+    
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.options).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Write the encoded bytes straight into the response body
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.options),
+            mimetype='application/json'
+        )
+
 # Initialize Flask app
 app = Flask(__name__, static_folder='../frontend')
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize processors
@@ -34,23 +78,65 @@ sam_processor = None
 avatar_generator = None
 virtual_fitter = None
 
-# In-memory cache for avatars and accessories
-avatars_cache = {}
-accessories_cache = {}
+# In-memory LRU cache for avatars, also capped by the total size of their
+# images, which dominate the server's memory use
+avatars_cache = LRUCache(
+    maxsize=int(os.environ.get('AVATARS_CACHE_SIZE', 100)),
+    max_bytes=int(os.environ.get('AVATARS_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+)
+
+# Inference runs on a bounded worker pool so request threads are never blocked
+# on SAM/MediaPipe; each request gets a job id whose future is kept in `jobs`.
+# Only finished jobs are evicted, so a queued or running job is always found
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('INFER_WORKERS', 4)),
+    thread_name_prefix='inference'
+)
+jobs = LRUCache(
+    maxsize=int(os.environ.get('JOBS_CACHE_SIZE', 256)),
+    evictable=lambda future: future.done()
+)
+
+# Cap on jobs that are queued or running. Each pending job holds a decoded
+# image, so past the cap requests are answered 503 instead of being queued
+MAX_PENDING_JOBS = int(os.environ.get('MAX_PENDING_JOBS', 32))
+pending_jobs = threading.BoundedSemaphore(MAX_PENDING_JOBS)
+
+# Helper threads for encoding a second image alongside the job thread; Pillow
+# releases the GIL inside the encoders, so two encodes overlap on two cores
+encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='encode')
+
+# Encoded result images, served as binary from /api/images/<image_id> instead
+# of being base64-inlined into the JSON responses
+images_cache = LRUCache(
+    maxsize=int(os.environ.get('IMAGES_CACHE_SIZE', 256)),
+    max_bytes=int(os.environ.get('IMAGES_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+)
+IMAGE_URL_PREFIX = '/api/images/'
 
 # Constants
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB max file size
 
+# Reject oversized uploads at the WSGI layer, before the body is read. This
+# also bounds base64 JSON payloads: their decoded size is at most 3/4 of the
+# body, so no separate check is needed after decoding
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
+# Encoding for returned photographic images. Lossy WebP encodes several times
+# faster than PNG and keeps the alpha channel (losslessly, at the default
+# alpha_quality); PNG is only used for binary masks
+IMAGE_ENCODING = {'format': 'WEBP', 'quality': 85, 'method': 4}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.before_first_request
 def initialize_models():
+    """Load the models eagerly at startup (called by wsgi.py and __main__)"""
     global sam_processor, avatar_generator, virtual_fitter
     try:
         logger.info("Initializing SAM processor...")
-        sam_processor = SAMProcessor()
+        sam_processor = SAMProcessor(model_type=os.environ.get('SAM_MODEL_TYPE', 'vit_b'))
         
         logger.info("Initializing avatar generator...")
         avatar_generator = AvatarGenerator()
@@ -60,9 +146,17 @@ def initialize_models():
         
         logger.info("All models initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing models: {e}")
+        logger.error("Error initializing models: %s", e)
         # Continue anyway, so API endpoints can return appropriate errors
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f"File too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)"}), 413
+
+@app.errorhandler(503)
+def server_busy(e):
+    return jsonify({'error': 'Server busy, try again later'}), 503, {'Retry-After': '1'}
+
 @app.route('/')
 def index():
     return send_from_directory(app.static_folder, 'index.html')
@@ -77,6 +171,11 @@ def segment_image():
         return jsonify({'error': 'SAM processor not initialized'}), 500
     
     try:
+        # Parse the JSON body once; multipart uploads have none
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'JSON body must be an object'}), 400
+        
         # Get image data from request
         if 'image' in request.files:
             # Handle file upload
@@ -85,62 +184,73 @@ def segment_image():
                 return jsonify({'error': 'File type not allowed'}), 400
             
             # Read the image
-            img = Image.open(file)
-            img_array = np.array(img)
-        elif request.json and 'image_data' in request.json:
+            img_array = decode_image(file.read())
+        elif 'image_data' in payload:
             # Handle base64 encoded image
-            image_data = request.json['image_data']
-            if image_data.startswith('data:image'):
-                # Remove the data URL prefix
-                image_data = image_data.split(',')[1]
-            
-            image_binary = base64.b64decode(image_data)
-            img = Image.open(BytesIO(image_binary))
-            img_array = np.array(img)
+            if not isinstance(payload['image_data'], str):
+                return jsonify({'error': 'image_data must be a string'}), 400
+            image_binary = decode_base64(payload['image_data'])
+            img_array = decode_image(image_binary)
         else:
             return jsonify({'error': 'No image provided'}), 400
         
         # Get optional parameters
-        auto_mode = request.json.get('auto_mode', True) if request.json else True
-        point = request.json.get('point') if request.json else None
-        box = request.json.get('box') if request.json else None
+        auto_mode = payload.get('auto_mode', True)
+        point = payload.get('point')
+        box = payload.get('box')
         
-        # Process the image with SAM
+        # Select the SAM prompt
         if auto_mode:
-            mask, masked_img = sam_processor.auto_segment_person(img_array)
+            segment = functools.partial(sam_processor.auto_segment_person, img_array)
         elif point:
-            mask, masked_img = sam_processor.segment_from_point(img_array, point)
+            segment = functools.partial(sam_processor.segment_from_point, img_array, point)
         elif box:
-            mask, masked_img = sam_processor.segment_from_box(img_array, box)
+            segment = functools.partial(sam_processor.segment_from_box, img_array, box)
         else:
             return jsonify({'error': 'Must provide point, box, or enable auto_mode'}), 400
         
-        # Convert results to base64 for sending back to client
-        mask_pil = Image.fromarray((mask * 255).astype(np.uint8))
-        masked_img_pil = Image.fromarray(masked_img)
-        
-        # Save to temporary buffers
-        mask_buffer = BytesIO()
-        masked_img_buffer = BytesIO()
-        
-        mask_pil.save(mask_buffer, format='PNG')
-        masked_img_pil.save(masked_img_buffer, format='PNG')
-        
-        # Convert to base64
-        mask_base64 = base64.b64encode(mask_buffer.getvalue()).decode('utf-8')
-        masked_img_base64 = base64.b64encode(masked_img_buffer.getvalue()).decode('utf-8')
-        
-        # Generate a unique ID for this segmentation
-        segment_id = f"segment_{int(time.time() * 1000)}"
+        def job():
+            # Process the image with SAM
+            mask, masked_img = segment()
+            
+            # Convert results for sending back to client. The boolean mask is
+            # not used again, so it is scaled to 0/255 in place through a
+            # uint8 view instead of allocating a temporary and a cast copy
+            mask_u8 = mask.view(np.uint8)
+            mask_u8 *= np.uint8(255)
+            
+            # Wrap the buffers as PIL images (fromarray maps the 'L' mask
+            # without copying it)
+            mask_pil = Image.fromarray(mask_u8)
+            masked_img_pil = Image.fromarray(masked_img)
+            
+            # Encode the mask on the encode pool while this thread encodes the
+            # masked image. The binary mask stays lossless PNG, at the fastest
+            # zlib level
+            mask_future = encode_pool.submit(store_image, mask_pil, 'PNG', compress_level=1)
+            masked_img_url = store_image(masked_img_pil, **IMAGE_ENCODING)
+            mask_url = mask_future.result()
+            
+            # Generate a unique ID for this segmentation
+            segment_id = new_id('segment')
+            
+            return {
+                'success': True,
+                'segment_id': segment_id,
+                'mask': mask_url,
+                'masked_image': masked_img_url
+            }
         
-        return jsonify({
-            'success': True,
-            'segment_id': segment_id,
-            'mask': f"data:image/png;base64,{mask_base64}",
-            'masked_image': f"data:image/png;base64,{masked_img_base64}"
-        })
+        return job_accepted(submit_job(job, 'segmentation'))
+    except HTTPException:
+        # Let Flask answer request errors such as 413 itself
+        raise
+    except ValueError as e:
+        # Undecodable base64 or image data is a client error; no traceback
+        logger.warning("Rejected segmentation request: %s", e)
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in segmentation: {e}", exc_info=True)
+        logger.error("Error in segmentation: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/generate-avatar', methods=['POST'])
@@ -149,19 +259,28 @@ def generate_avatar():
         return jsonify({'error': 'Avatar generator not initialized'}), 500
     
     try:
+        # Parse the JSON body once; multipart uploads have none
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'JSON body must be an object'}), 400
+        
         # Check if we received the segmented image
-        if request.json and 'masked_image' in request.json:
-            # Base64 image
-            masked_image_data = request.json['masked_image']
-            if masked_image_data.startswith('data:image'):
-                # Remove the data URL prefix
-                masked_image_data = masked_image_data.split(',')[1]
+        if 'masked_image' in payload:
+            masked_image_data = payload['masked_image']
+            if not isinstance(masked_image_data, str):
+                return jsonify({'error': 'masked_image must be a string'}), 400
+            if masked_image_data.startswith(IMAGE_URL_PREFIX):
+                # Image URL returned by /api/segment
+                stored = images_cache.get(masked_image_data[len(IMAGE_URL_PREFIX):])
+                if stored is None:
+                    return jsonify({'error': 'Image not found'}), 404
+                image_binary = stored[0]
+            else:
+                # Base64 image
+                image_binary = decode_base64(masked_image_data)
             
-            image_binary = base64.b64decode(masked_image_data)
-            masked_img = Image.open(BytesIO(image_binary))
-            
-            # Convert to numpy array
-            masked_img_array = np.array(masked_img)
+            # Decode to a numpy array, keeping the alpha channel
+            masked_img_array = decode_image(image_binary)
             
         elif 'image' in request.files and 'mask' in request.files:
             # File uploads
@@ -172,37 +291,51 @@ def generate_avatar():
                 return jsonify({'error': 'File type not allowed'}), 400
             
             # Read the images
-            image = np.array(Image.open(image_file))
-            mask = np.array(Image.open(mask_file).convert('L')) > 0
+            image = decode_image(image_file.read())
+            # The uint8 mask is passed as is; apply_mask thresholds it into
+            # the alpha channel without a separate boolean array
+            mask = decode_image(mask_file.read(), cv2.IMREAD_GRAYSCALE)
             
             # Apply the mask
             masked_img_array = avatar_generator.apply_mask(image, mask)
         else:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Generate the avatar
-        avatar_data = avatar_generator.generate(masked_img_array)
-        
-        # Generate a unique ID for this avatar
-        avatar_id = f"avatar_{int(time.time() * 1000)}"
-        
-        # Store in cache
-        avatars_cache[avatar_id] = avatar_data
-        
-        # Convert to base64
-        avatar_pil = Image.fromarray(avatar_data['image'])
-        avatar_buffer = BytesIO()
-        avatar_pil.save(avatar_buffer, format='PNG')
-        avatar_base64 = base64.b64encode(avatar_buffer.getvalue()).decode('utf-8')
+        def job():
+            # Generate the avatar
+            avatar_data = avatar_generator.generate(masked_img_array)
+            
+            # Generate a unique ID for this avatar
+            avatar_id = new_id('avatar')
+            
+            # Try-on jobs for one avatar each read and replace its image, so
+            # they take this lock in turn instead of losing each other's result
+            avatar_data['lock'] = threading.Lock()
+            
+            # Store in cache
+            avatars_cache[avatar_id] = avatar_data
+            
+            # Encode and store for /api/images
+            avatar_pil = Image.fromarray(avatar_data['image'])
+            avatar_url = store_image(avatar_pil, **IMAGE_ENCODING)
+            
+            return {
+                'success': True,
+                'avatar_id': avatar_id,
+                'avatar_image': avatar_url,
+                'landmarks': avatar_data.get('landmarks', None)
+            }
         
-        return jsonify({
-            'success': True,
-            'avatar_id': avatar_id,
-            'avatar_image': f"data:image/png;base64,{avatar_base64}",
-            'landmarks': avatar_data.get('landmarks', None)
-        })
+        return job_accepted(submit_job(job, 'avatar generation'))
+    except HTTPException:
+        # Let Flask answer request errors such as 413 itself
+        raise
+    except ValueError as e:
+        # Undecodable base64 or image data is a client error; no traceback
+        logger.warning("Rejected avatar generation request: %s", e)
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error generating avatar: {e}", exc_info=True)
+        logger.error("Error generating avatar: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/try-on', methods=['POST'])
@@ -211,9 +344,11 @@ def try_on_accessory():
         return jsonify({'error': 'Virtual fitter not initialized'}), 500
     
     try:
-        data = request.json
+        data = request.get_json(silent=True)
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
+        if not isinstance(data, dict):
+            return jsonify({'error': 'JSON body must be an object'}), 400
             
         # Get required parameters
         avatar_id = data.get('avatar_id')
@@ -222,9 +357,12 @@ def try_on_accessory():
         
         if not all([avatar_id, accessory_id, category]):
             return jsonify({'error': 'Missing required parameters'}), 400
+        if not all(isinstance(value, str) for value in (avatar_id, accessory_id, category)):
+            return jsonify({'error': 'Parameters must be strings'}), 400
         
-        # Check if avatar exists in cache
-        if avatar_id not in avatars_cache:
+        # Check if avatar exists in cache (it may have been evicted)
+        avatar_data = avatars_cache.get(avatar_id)
+        if avatar_data is None:
             return jsonify({'error': 'Avatar not found'}), 404
         
         # Get the accessory
@@ -233,34 +371,63 @@ def try_on_accessory():
         if not accessory:
             return jsonify({'error': 'Accessory not found'}), 404
         
-        # Apply the accessory to the avatar
-        avatar_data = avatars_cache[avatar_id]
-        result_image = virtual_fitter.apply_accessory(
-            avatar_data['image'],
-            accessory,
-            category,
-            avatar_data.get('landmarks')
-        )
-        
-        # Convert to base64
-        result_pil = Image.fromarray(result_image)
-        result_buffer = BytesIO()
-        result_pil.save(result_buffer, format='PNG')
-        result_base64 = base64.b64encode(result_buffer.getvalue()).decode('utf-8')
-        
-        # Update the avatar in cache
-        avatar_data['image'] = result_image
-        avatars_cache[avatar_id] = avatar_data
+        def job():
+            with avatar_data['lock']:
+                # Apply the accessory to the avatar
+                result_image = virtual_fitter.apply_accessory(
+                    avatar_data['image'],
+                    accessory,
+                    category,
+                    avatar_data.get('landmarks')
+                )
+                
+                # Update the avatar in cache
+                avatar_data['image'] = result_image
+                avatars_cache[avatar_id] = avatar_data
+            
+            # Encode and store for /api/images
+            result_pil = Image.fromarray(result_image)
+            result_url = store_image(result_pil, **IMAGE_ENCODING)
+            
+            return {
+                'success': True,
+                'avatar_id': avatar_id,
+                'result_image': result_url
+            }
         
-        return jsonify({
-            'success': True,
-            'avatar_id': avatar_id,
-            'result_image': f"data:image/png;base64,{result_base64}"
-        })
+        return job_accepted(submit_job(job, 'accessory fitting'))
+    except HTTPException:
+        # Let Flask answer request errors such as 413 itself
+        raise
     except Exception as e:
-        logger.error(f"Error applying accessory: {e}", exc_info=True)
+        logger.error("Error applying accessory: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/result/<job_id>', methods=['GET'])
+def get_result(job_id):
+    future = jobs.get(job_id)
+    if future is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Still queued or running
+    if not future.done():
+        return job_accepted(job_id)
+    
+    try:
+        return jsonify(future.result())
+    except Exception as e:
+        # The failure has already been logged by the worker
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/images/<image_id>', methods=['GET'])
+def get_image(image_id):
+    stored = images_cache.get(image_id)
+    if stored is None:
+        return jsonify({'error': 'Image not found'}), 404
+    
+    data, mimetype = stored
+    return Response(data, mimetype=mimetype, headers={'Cache-Control': 'private, max-age=3600'})
+
 @app.route('/api/accessories', methods=['GET'])
 def get_accessories():
     category = request.args.get('category', 'all')
@@ -277,24 +444,129 @@ def get_accessories():
             'accessories': accessories
         })
     except Exception as e:
-        logger.error(f"Error getting accessories: {e}")
+        logger.error("Error getting accessories: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Utility functions
 
+def new_id(prefix):
+    """Generate a collision-free id; millisecond timestamps collide under concurrency"""
+    return f"{prefix}_{secrets.token_urlsafe(12)}"
+
+def submit_job(job, description):
+    """Run a job on the inference executor and return its job id (503 when full)"""
+    # Refuse new work past MAX_PENDING_JOBS rather than queueing without limit
+    if not pending_jobs.acquire(blocking=False):
+        logger.warning("Rejected %s request: %d jobs pending", description, MAX_PENDING_JOBS)
+        raise ServiceUnavailable()
+    
+    def run():
+        try:
+            return job()
+        except Exception as e:
+            logger.error("Error in %s: %s", description, e, exc_info=True)
+            raise
+        finally:
+            pending_jobs.release()
+    
+    job_id = new_id('job')
+    try:
+        jobs[job_id] = executor.submit(run)
+    except Exception:
+        pending_jobs.release()
+        raise
+    
+    return job_id
+
+def job_accepted(job_id):
+    """Build the 202 response for a pending job"""
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'pending',
+        'result_url': f"/api/result/{job_id}"
+    }), 202
+
+def decode_base64(data):
+    """Decode a base64 string or data URL, skipping the data URL prefix"""
+    # Locate the payload by index rather than split(','), which would build a
+    # list holding a full copy of the (possibly multi-MB) payload
+    comma = data.find(',') if data.startswith('data:image') else -1
+    payload = data[comma + 1:] if comma >= 0 else data
+    
+    return binascii.a2b_base64(payload)
+
+def decode_image(data, flags=cv2.IMREAD_UNCHANGED):
+    """
+    Decode encoded image bytes straight to a numpy array with OpenCV
+    
+    Color images are returned as RGB or RGBA (alpha is kept), grayscale images
+    as 2D arrays, always 8 bits per channel.
+    """
+    # imdecode asserts on an empty buffer (an empty upload, or base64 text whose
+    # invalid characters a2b_base64 dropped)
+    if not data:
+        raise ValueError("Could not decode image")
+    
+    # JPEGs go through libjpeg-turbo when available, which decodes straight to
+    # RGB (or gray) and skips the BGR conversion below
+    if turbo_jpeg and data[:3] == b'\xff\xd8\xff' and flags in (cv2.IMREAD_UNCHANGED, cv2.IMREAD_GRAYSCALE):
+        try:
+            if flags == cv2.IMREAD_GRAYSCALE:
+                return turbo_jpeg.decode(data, pixel_format=TJPF_GRAY)[:, :, 0]
+            return turbo_jpeg.decode(data, pixel_format=TJPF_RGB)
+        except OSError:
+            # Fall back to OpenCV, which tolerates more damaged files
+            pass
+    
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    except cv2.error:
+        image = None
+    if image is None:
+        raise ValueError("Could not decode image")
+    
+    # 16-bit PNGs are reduced to 8 bits, matching the rest of the pipeline
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    
+    # OpenCV decodes to BGR(A); the processors expect RGB(A)
+    if image.ndim == 3 and image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    elif image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    
+    return image
+
+def store_image(image, format, **params):
+    """Encode a PIL image and store it for /api/images, returning its URL"""
+    buffer = BytesIO()
+    image.save(buffer, format=format, **params)
+    
+    image_id = new_id('image')
+    images_cache[image_id] = (buffer.getvalue(), f"image/{format.lower()}")
+    
+    return f"{IMAGE_URL_PREFIX}{image_id}"
+
 def get_accessory_by_id(accessory_id, category):
     """Get accessory by ID from a specific category"""
     # In a real app, this would fetch from a database
-    # For now, return a dummy accessory
     accessory_path = os.path.join('accessories', category, f"{accessory_id}.png")
     
-    return {
+    accessory = {
         'id': accessory_id,
         'name': f"{category.title()} {accessory_id}",
         'category': category,
-        'path': accessory_path,
-        'image': np.zeros((100, 100, 4), dtype=np.uint8)  # Placeholder image
+        'path': accessory_path
     }
+    
+    # Attach the decoded image; without it the fitter falls back to the path
+    # (and its placeholder when the file doesn't exist)
+    accessory_image = load_accessory_image(accessory_path) if os.path.exists(accessory_path) else None
+    if accessory_image is not None:
+        accessory['image'] = accessory_image
+    
+    return accessory
 
 def get_accessories_by_category(category):
     """Get all accessories for a category"""
@@ -333,6 +605,7 @@ def get_all_accessories():
     return all_accessories
 
 if __name__ == '__main__':
+    # Development server only; production deployments use Gunicorn (wsgi.py)
     # Initialize models on startup
     initialize_models()
     
@@ -340,5 +613,5 @@ if __name__ == '__main__':
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
     
-    logger.info(f"Starting server on {host}:{port} (debug: {debug_mode})")
+    logger.info("Starting server on %s:%s (debug: %s)", host, port, debug_mode)
     app.run(host=host, port=port, debug=debug_mode)
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+WSGI entry point for running the Virtual Fitting Avatar API under Gunicorn
+
+    gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 --timeout 120 wsgi:app
+
+Use a single worker: jobs, result images and avatars live in the memory of the
+process that created them, so polls and image URLs must reach that process.
+Scale with --threads and INFER_WORKERS; several workers need sticky routing
+or a shared store.
+
+Each worker process imports this module and loads its own copy of the models.
+With several workers on CPU-only hosts, add --preload to load them once in the
+master process instead: the workers are forked afterwards and share the weight
+pages copy-on-write. Do not preload when SAM runs on CUDA, since a CUDA
+context does not survive fork.
+"""
+
+from server import app, initialize_models
+
+# Load the models at import time rather than on the first request, in the
+# master with --preload or in each worker otherwise
+initialize_models()
\ No newline at end of file
@@ -20,7 +20,12 @@ pip install -r backend/requirements.txt
 
 # Download models
 echo "Downloading SAM model... (this may take a while)"
-python backend/download_models.py --model vit_h
+python backend/download_models.py --model vit_b
+
+# Download MediaPipe Tasks models (enables the GPU delegate for face/pose landmarks)
+echo "Downloading MediaPipe landmark models..."
+python backend/download_models.py --model face_landmarker
+python backend/download_models.py --model pose_landmarker
 
 # Create necessary directories
 echo "Creating directory structure..."